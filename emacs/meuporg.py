@@ -2,6 +2,7 @@
 # Time-stamp: <2025-01-05 21:14:01>
 
 import re
+import sys
 
 
 # !SECTION! Identifying and parsing items 
@@ -10,27 +11,24 @@ BEGIN_TITLE      = r"!"
 END_TITLE        = r"!"
 CONTINUED_PREFIX = r"!"
 TITLE_REGEXP     = re.compile(r".*" + BEGIN_TITLE + r"(\w+)" + END_TITLE + r"(.*)")
-CONTINUED_REGEXP = re.compile(r"\W*" + CONTINUED_PREFIX + r" *(.*)")
 
+# The title regexp and the continuation pattern (non-word characters,
+# then CONTINUED_PREFIX and the continued content) fused and anchored
+# at the start of each line, so that a whole file can be scanned with a
+# single finditer: groups 1 and 2 are the header and its text, group 3
+# is a continuation. As the title branch comes first, a header always
+# wins over a continuation. The continuation may not span several
+# lines, hence `[^\w\n]` rather than `\W`.
+#
+# The lookahead is a cheap literal prefilter: lines that contain neither
+# marker (i.e. almost all of them) are rejected in one pass, instead of
+# going through the backtracking of both `.*` branches.
+LINE_REGEXP      = re.compile(r"^(?=.*?(?:" + BEGIN_TITLE + r"|" + CONTINUED_PREFIX + r"))" +
+                              r"(?:" + TITLE_REGEXP.pattern +
+                              r"|.*?[^\w\n]*" + CONTINUED_PREFIX + r" *(.*))",
+                              re.MULTILINE)
 
 
-def extract_header_if_present(line):
-    content = TITLE_REGEXP.findall(line)
-    if content:
-        header = content[0][0]
-        text = content[0][1].strip()
-        return header, text
-    else:
-        return ""
-    
-
-def extract_continued_content_if_present(line):
-    content = CONTINUED_REGEXP.findall(line)
-    if content:
-        return content[0].strip() + " "
-    else:
-        return ""
-        
 
 # !SECTION! The classes used to store and parse the files
 # =======================================================
@@ -43,7 +41,11 @@ SECTION_REGEXP = re.compile(r"({})*{}".format(SUBSECTION_PREFIX,
                                               SECTION_SUFFIX))
 
 def get_title_depth(title):
-    if SECTION_REGEXP.match(title):
+    # most titles (TODO, FIXME...) are not sections, and those can be
+    # told apart without calling the regexp engine
+    if SECTION_SUFFIX not in title:
+        return -1
+    elif SECTION_REGEXP.match(title):
         return 1 + int((len(title) - len(SECTION_SUFFIX)) / len(SUBSECTION_PREFIX))
     else:
         return -1
@@ -59,22 +61,30 @@ class MeuporgItem:
     successors, and exactly one predecessor.
 
     """
-    def __init__(self, title, content, line_number):
+    __slots__ = ("title", "content", "line_number",
+                 "successors", "predecessor", "depth")
+    
+    def __init__(self, title, content, line_number, depth=None):
         self.title = title
         self.content = content
         self.line_number = line_number
         # currently unset parameters
         self.successors = []
         self.predecessor = None
-        self.depth = get_title_depth(title) 
+        if depth == None:
+            self.depth = get_title_depth(title)
+        else:
+            self.depth = depth
 
 
     def finalize(self):
+        # absorb_item only ever sets the predecessor of an item right
+        # after appending it to the successors of said predecessor, so
+        # there is no need to look for it there (which would cost a
+        # linear scan at each step of the walk up the tree)
         if self.predecessor == None:
             return self
         else:
-            if self not in self.predecessor.successors:
-                self.predecessor.successors.append(self)
             return self.predecessor
 
         
@@ -96,7 +106,8 @@ class MeuporgItem:
             return new_entry
         else:
             cursor = self
-            while cursor.depth > new_entry.depth:
+            target_depth = new_entry.depth
+            while cursor.depth > target_depth:
                 cursor = cursor.finalize()
             return cursor
 
@@ -111,9 +122,11 @@ IN_ITEM  = 1
 
 
 class ItemScanner:
-    """Is initialized with a list of strings, and extracts all the
-    meuporg items in it as MeuporgItem:s. Then, can be used to iterate
-    through them in order of arrival:
+    """Is initialized with the content of a file, either as a single
+    string or as an iterable of strings (one per line, with or without
+    their newline characters, e.g. an open file), and extracts all the meuporg items in it as
+    MeuporgItem:s. Then, can be used to iterate through them in order
+    of arrival:
 
     for x in ItemScanner(list_of_lines):
         <some processing of the MeuporgItem x>
@@ -122,7 +135,10 @@ class ItemScanner:
     The inspiration for the ItemScanner is a Turing machine where the
     file is the input tape, and each line is a cell. The action
     undertaken depends on the state of the Scanner, and said state can
-    be updated depending on the cell being scanned.
+    be updated depending on the cell being scanned. Lines that contain
+    neither a title nor a continuation cannot change anything but the
+    state, so only the lines matched by LINE_REGEXP are looked at, and
+    a gap between two of them brings the Scanner back to SCANNING.
 
     It does *not* handle the context in which items are found, that is
     the job of FileMap class. It returns the items as they are found,
@@ -134,8 +150,15 @@ class ItemScanner:
         self.current_item = None
         self.line_number = 0
         self.item_list = []
-        for x in lines:
-            self.process_new_line(x)
+        if isinstance(lines, str):
+            text = lines
+        else:
+            text = "\n".join(line.rstrip("\n") for line in lines)
+        position, line_number = 0, 1
+        for content in LINE_REGEXP.finditer(text):
+            line_number += text.count("\n", position, content.start())
+            position = content.start()
+            self.process_new_match(content, line_number)
         self.finalize_current_item()
 
         
@@ -146,26 +169,23 @@ class ItemScanner:
         self.state = SCANNING
         
 
-    def process_new_line(self, line):
-        self.line_number += 1
-        potential_item = extract_header_if_present(line)
-        if potential_item:
+    def process_new_match(self, content, line_number):
+        if content.group(1) != None:
             # we have obtained a new item
             self.finalize_current_item()
+            # titles are drawn from a handful of values (TODO, SECTION...),
+            # so all items share the same interned strings
             self.current_item = MeuporgItem(
-                potential_item[0],
-                potential_item[1],
-                self.line_number
+                sys.intern(content.group(1)),
+                content.group(2).strip(),
+                line_number
             )
             self.state = IN_ITEM
-        elif (self.state == IN_ITEM):
-            potential_continuation = extract_continued_content_if_present(line)
-            if potential_continuation:
-                self.current_item.content += potential_continuation
-            else:
-                self.finalize_current_item()
+        elif (self.state == IN_ITEM) and (line_number == self.line_number + 1):
+            self.current_item.content += content.group(3).strip() + " "
         else:
             self.finalize_current_item()
+        self.line_number = line_number
 
             
     def __len__(self):
@@ -185,9 +205,9 @@ def parse_lines(lines):
     cursor = MeuporgItem(
         "main",
         "",
-        0
+        0,
+        depth=0
     )
-    cursor.depth = 0
     for x in ItemScanner(lines):
         cursor = cursor.absorb_item(x)
     while cursor.depth > 0:
@@ -196,29 +216,38 @@ def parse_lines(lines):
 
 
 
-def format_MeuporgItem(it, file_path, title):
-    result = ""
-    if it.title == "main":
-        result = "* {}\n".format(title)
-        for x in it.successors:
-            result += format_MeuporgItem(x, file_path, title)
-    elif it.successors == None:
-        result += "{} {} ({})\n".format(
-            "*" * (it.depth + 1),
-            it.title,
-            it.line_number,
-        )
-        if len(it.content) > 0:
-            result += it.content + "\n"
-    else:
-        result += "{} {} ({})\n".format(
+def iter_format_MeuporgItem(it, file_path, title):
+    """Yields the lines of the org-mode representation of the tree
+    rooted in `it`, so that it can be written as it is generated.
+
+    """
+    # the tree is walked in pre-order using an explicit stack (children
+    # are pushed in reverse so that they are popped in order)
+    to_format = [it]
+    while len(to_format) > 0:
+        it = to_format.pop()
+        if it.title == "main":
+            yield "* {}\n".format(title)
+            to_format.extend(reversed(it.successors))
+        elif it.successors == None:
+            yield "{} {} ({})\n".format(
                 "*" * (it.depth + 1),
-                it.content,
+                it.title,
                 it.line_number,
-        )
-        for x in it.successors:
-            result += format_MeuporgItem(x, file_path, title)
-    return result
+            )
+            if len(it.content) > 0:
+                yield it.content + "\n"
+        else:
+            yield "{} {} ({})\n".format(
+                    "*" * (it.depth + 1),
+                    it.content,
+                    it.line_number,
+            )
+            to_format.extend(reversed(it.successors))
+
+
+def format_MeuporgItem(it, file_path, title):
+    return "".join(iter_format_MeuporgItem(it, file_path, title))
 
 
 
@@ -254,7 +283,7 @@ if __name__ == "__main__":
         print(it.title, it.content)
     print("\nSORTING\n")
     
-    print(format_MeuporgItem(parse_lines(test),
-                             "fictitious/file.txt",
-                             "Fictitious Tasks"))
+    sys.stdout.writelines(iter_format_MeuporgItem(parse_lines(test),
+                                                  "fictitious/file.txt",
+                                                  "Fictitious Tasks"))
 
@@ -6,10 +6,10 @@ import datetime, time
 import sys, os
 import pickle
 import re
+import functools
+from math import log
 from rich.progress import Progress
 
-from collections import defaultdict
-
 
 
 # !SECTION! Setting up default parameters and the context 
@@ -31,15 +31,28 @@ try:
 except:
     IS_SAGE = False
 
-# In SAGE, there are more number types than in plain python
+# In SAGE, there are more number types than in plain python. Only the
+# modules defining them are imported: importing `sage.all` takes
+# seconds, and is not needed to recognize them. Some SAGE modules can
+# however only be imported once `sage.all` has been, in which case we
+# fall back to it.
 if IS_SAGE:
-    from sage.all import *
+    try:
+        from sage.rings.integer import Integer
+        from sage.rings.real_mpfr import RealNumber
+        from sage.matrix.matrix0 import Matrix as SageMatrix
+    except ImportError:
+        import sage.all
+        from sage.rings.integer import Integer
+        from sage.rings.real_mpfr import RealNumber
+        from sage.matrix.matrix0 import Matrix as SageMatrix
     int_types = (int, Integer)
-    float_types = (float, sage.rings.real_mpfr.RealNumber)
+    float_types = (float, RealNumber)
+    matrix_types = (SageMatrix)
 else:
     int_types = (int)
     float_types = (float)
-    from math import floor # needed when computing elapsed time
+    matrix_types = ()
 
 
 # !SUBSECTION! The ONGOING_LOGBOOK global variable
@@ -55,9 +68,18 @@ old_print = builtins.print
 
 # !SUBSECTION! Default strings
 
+# As time-stamps are precise to the second, the last one is kept and
+# only recomputed when the second changes.
+LAST_TIME_STAMP = [None, ""]
+
 def time_stamp():
     """Returns a string representation of the current date and time."""
-    return datetime.datetime.now().isoformat(" ").split(".")[0]
+    second = int(time.time())
+    if second != LAST_TIME_STAMP[0]:
+        LAST_TIME_STAMP[0] = second
+        LAST_TIME_STAMP[1] = time.strftime("%Y-%m-%d %H:%M:%S",
+                                           time.localtime(second))
+    return LAST_TIME_STAMP[1]
 
 
 # The default strings used when printing both to stdout and to files
@@ -65,6 +87,22 @@ INDENT = " "
 DEFAULT_INT_FORMAT = "{:3d}"
 DEFAULT_FLOAT_FORMAT = "{:8.3e}"
 
+# The number of story entries kept in memory before they are written
+# to the logbook file
+STORY_BUFFER_SIZE = 1024
+
+# The number of times per second progress bars are updated
+PROGRESS_UPDATES_PER_SECOND = 10
+
+# The markers of the headings of each depth are computed once when a
+# LogBook is created, up to this depth (deeper ones are added when
+# they are first needed)
+MAX_HEADING_DEPTH = 8
+
+# The suffix of the basket file while the LogBook that fills it is
+# still running; it is removed once the basket is complete
+UNFINISHED_BASKET_SUFFIX = ".part"
+
 
 # !SUBSECTION! To have colors in the terminal
 
@@ -84,19 +122,85 @@ T_COLORS = {
 }
     
 def stylize(line, style):
-    if style not in T_COLORS.keys():
+    if style not in T_COLORS:
         raise Exception("unknown style: '{}".format(style))
     return T_COLORS[style] + line + T_COLORS["endcol"]
 
 
+# The styled strings needed each time an event or a heading is
+# printed are built once and for all, so that printing them boils down
+# to concatenating constants instead of calling `stylize` several
+# times per line.
+END_STYLE = T_COLORS["endcol"]
+TSTAMP_START = T_COLORS["white"] + "("
+TSTAMP_END = ") " + END_STYLE
+HEADING_TSTAMP_START = T_COLORS["white"] + " ("
+HEADING_STARTS = {
+    1: T_COLORS["bold"] + T_COLORS["purple"],
+    2: T_COLORS["purple"],
+}
+HEADING_ENDS = {
+    1: END_STYLE + END_STYLE,
+    2: END_STYLE,
+}
+FAIL_PREFIX = stylize("[FAIL] ", "red")
+SUCCESS_PREFIX = stylize("[SUCCESS] ", "green")
+
+
+# !SUBSECTION! Parsing event descriptions
+
+# The `desc` string of an event is a set of one-character flags. It is
+# turned into an integer bit mask so that `log_event` tests bits rather
+# than scanning the string for each flag; as only a handful of
+# distinct `desc` strings are used in practice, parsing is cached.
+DESC_NO_TSTAMP = 1 << 0         # "*": no time-stamp
+DESC_RED       = 1 << 1         # "r": printed in red
+DESC_GREEN     = 1 << 2         # "g": printed in green
+DESC_FAIL      = 1 << 3         # "0": prefixed with [FAIL]
+DESC_SUCCESS   = 1 << 4         # "1": prefixed with [SUCCESS]
+DESC_LIST      = 1 << 5         # "l": item of a plain list
+DESC_ENUM      = 1 << 6         # "n": item of a numbered list
+DESC_FLAGS = {
+    "*": DESC_NO_TSTAMP,
+    "r": DESC_RED,
+    "g": DESC_GREEN,
+    "0": DESC_FAIL,
+    "1": DESC_SUCCESS,
+    "l": DESC_LIST,
+    "n": DESC_ENUM,
+}
+
+@functools.lru_cache(maxsize=64)
+def parse_desc(desc):
+    """Returns the bit mask corresponding to the `desc` string of an
+    event; characters that are not flags (such as "t") are ignored."""
+    mask = 0
+    for flag in DESC_FLAGS.keys():
+        if flag in desc:
+            mask |= DESC_FLAGS[flag]
+    return mask
+
+
 # !SUBSECTION!  Printing functions
 
 # Several functions that print their input in a pretty way, either for
 # humain readability or for Python readability.
 
+# Logged results tend to contain the same integers over and over, so
+# their formatting is cached. Floats are not: -0.0 and 0.0 are equal
+# (and have the same hash), so they would share a cache entry even
+# though they are printed differently.
+@functools.lru_cache(maxsize=4096, typed=True)
+def format_int(x, int_format):
+    """Returns the integer `x` formatted using the format string
+    `int_format`."""
+    return int_format.format(x)
+
+
 def pretty_result(r,
                   int_format=DEFAULT_INT_FORMAT,
-                  float_format=DEFAULT_FLOAT_FORMAT,):
+                  float_format=DEFAULT_FLOAT_FORMAT,
+                  sort_keys=False):
     """Outputs a human readable pretty string representating the input
     `r`.
 
@@ -113,34 +217,43 @@ def pretty_result(r,
     - `float_format` (defaults to DEFAULT_INT_FORMAT): the format
       string used to print floats (and associated types).
 
+    - `sort_keys` (defaults to False): if set to True, the entries of
+      dictionaries are printed in increasing order of their keys
+      rather than in insertion order.
+
     """
-    if isinstance(r, dict) or isinstance(r, defaultdict):
-        result = ""
-        for k in sorted(r.keys()):
-            result += "{}={}, ".format(pretty_result(k), pretty_result(r[k]))
-        return result[:-2]
-    elif (isinstance(r, list) and len(r) > 0):
-        if isinstance(r[0], list):
-            # case of a matrix as a list of list
-            result = "table:\n"
-            for row in r:
-                for x in row:
-                    result += "| {} ".format(pretty_result(x))
-                result += "|\n"
-            return result
-        else:
-            # case of a plain list
-            return str(r)
-    elif isinstance(r, int_types):
-        return int_format.format(r)
-    elif isinstance(r, float_types):
-        return float_format.format(r)
-    elif IS_SAGE:
-        if "sage.matrix" in str(type(r)):
-            return pretty_result([[x for x in row] for row in r.rows()])
-        else:
-            pass
-    return str(r)
+    # the recursive calls go through a closure, so that the formats
+    # are used at every depth without being passed around, and so that
+    # the global type information is looked up only once
+    ints, floats, matrices = int_types, float_types, matrix_types
+    
+    def pretty(r):
+        # numbers are by far the most common inputs, so they are
+        # handled first
+        if isinstance(r, ints):
+            return format_int(r, int_format)
+        elif isinstance(r, floats):
+            return float_format.format(r)
+        elif isinstance(r, dict):
+            return ", ".join(
+                "{}={}".format(pretty(k), pretty(v))
+                for k, v in (sorted(r.items()) if sort_keys else r.items())
+            )
+        elif (isinstance(r, list) and len(r) > 0):
+            if isinstance(r[0], list):
+                # case of a matrix as a list of list
+                return "table:\n" + "".join(
+                    "".join("| {} ".format(pretty(x)) for x in row) + "|\n"
+                    for row in r
+                )
+            else:
+                # case of a plain list
+                return str(r)
+        elif isinstance(r, matrices):
+            return pretty([[x for x in row] for row in r.rows()])
+        return str(r)
+    
+    return pretty(r)
 
 
 def input_for_print(to_print):
@@ -153,10 +266,7 @@ def input_for_print(to_print):
     if len(to_print) == 1:
         return str(to_print[0])
     else:
-        result = ""
-        for x in to_print:
-            result += "  {}\n".format(pretty_result(x))
-        return result[:-1]
+        return "\n".join("  {}".format(pretty_result(x)) for x in to_print)
         
 
 
@@ -167,18 +277,20 @@ def input_for_print(to_print):
 class Chronograph:
     def __init__(self, title):
         self.title = title
-        self.start_time = datetime.datetime.now()
+        # a monotonic clock is used as we only care about durations
+        self.start_time = time.monotonic()
 
     def __str__(self):
-        elapsed_time = datetime.datetime.now() - self.start_time
-        tot_secs = floor(elapsed_time.total_seconds())
-        days = floor(tot_secs / 86400)
-        hours = floor((tot_secs % 86400) / 3600)
-        minutes = floor((tot_secs % 3600) / 60)
-        seconds = (tot_secs % 60) + elapsed_time.total_seconds() - tot_secs
+        # rounded to the microsecond, like a `timedelta` would be
+        elapsed_time = round(time.monotonic() - self.start_time, 6)
+        tot_secs = int(elapsed_time)
+        days, remainder = divmod(tot_secs, 86400)
+        hours, remainder = divmod(remainder, 3600)
+        minutes, remainder = divmod(remainder, 60)
+        seconds = remainder + elapsed_time - tot_secs
         return "\"{}\" lasted {}s ({})".format(
             self.title,
-            elapsed_time.total_seconds(),
+            elapsed_time,
             "{:d}d {:02d}h {:02d}m {:5.03f}s".format(
                 days,
                 hours,
@@ -189,14 +301,43 @@ class Chronograph:
 
 
 class MemTracer:
-    def __init__(self):
+    """Measures the peak memory usage of the program.
+
+    By default, the peak is the one maintained by the OS for the whole
+    process, which costs nothing while the program runs. If
+    `with_tracemalloc` is set to True (or if the `resource` module is
+    not available), tracemalloc is used instead: it only counts the
+    allocations made after the MemTracer is created, but it slows down
+    every single allocation.
+
+    """
+    def __init__(self, with_tracemalloc=False):
+        self.mem_tracer = None
+        if not with_tracemalloc:
+            try:
+                import resource
+                self.resource = resource
+                return
+            except ImportError:
+                pass
         import tracemalloc as local_mem_tracer
         self.mem_tracer = local_mem_tracer
         self.mem_tracer.start()
 
+    def peak(self):
+        """Returns the peak memory usage in bytes."""
+        if self.mem_tracer == None:
+            memory_peak = self.resource.getrusage(self.resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS, and in kB elsewhere
+            if sys.platform != "darwin":
+                memory_peak *= 1024
+        else:
+            memory_size, memory_peak = self.mem_tracer.get_traced_memory()
+            self.mem_tracer.stop()
+        return memory_peak
+
     def __str__(self):
-        memory_size, memory_peak = self.mem_tracer.get_traced_memory()
-        self.mem_tracer.stop()
+        memory_peak = self.peak()
         if memory_peak > 1024**3:
             pretty_peak = "(= {:.2f}GB)".format(memory_peak / 1024**3)
         elif memory_peak > 1024**2:
@@ -231,12 +372,20 @@ class LogBook:
       elements are either headings (with a given depth), or pairs
       (time-stamp, string). The time-stamps are generated
       automatically. It is output to stdout if `verbose` is set to
-      True, and to a specified file.
+      True, and to a specified file. The latter is written while the
+      script runs: `self.story` only holds the events that have not
+      been written yet.
     
     - The "basket" (stored in `self.basket`), which correspond to
       things that are intended to be kept at the end of the
       execution. It is stored in a separate file that can be easily
-      loaded from python for later use.
+      loaded from python for later use (see `open_basket`); each
+      entry is appended to said file as soon as it is added to the
+      basket. The file is thus a snapshot of each entry at the time it
+      was added: later modifications of a logged object only change
+      `self.basket`, not the file. Until the LogBook is closed, the
+      file name ends with ".part", so that `grab_last_basket` ignores
+      it.
 
 
     Inputs:
@@ -259,9 +408,11 @@ class LogBook:
     - `with_time`: if set to True, the time during which the LogBook
       is used is computed and output in the end. Defaults to True.
 
-    - `with_mem`: if set to True, the maximum memory used while the
-      LogBook is used is computed and output in the end. Defaults to
-      True.
+    - `with_mem`: if set to True, the maximum memory used by the
+      program is output in the end, as measured by the OS. If set to
+      "tracemalloc", tracemalloc is used instead to only measure the
+      memory allocated while the LogBook is used, which is more
+      precise but slows down the program. Defaults to False.
 
     - `with_preamble`: if set to True, the output (both in the
       terminal and in the file) will contain a preamble describing
@@ -274,6 +425,13 @@ class LogBook:
       the time and memory complexities of the program, as a well the
       number of results obtained. Defaults to True.
 
+    - `display_buffer_size`: the number of lines that are accumulated
+      before being printed in the terminal all at once, which is
+      faster when a lot of events are logged. Defaults to 1, meaning
+      that each line is printed as soon as it is logged. Pending
+      lines are printed when leaving the LogBook, or by calling its
+      `flush` method.
+
     Usage:
 
     The context defined when using this class defines contains new
@@ -344,17 +502,10 @@ class LogBook:
                  with_mem=False,
                  with_preamble=True,
                  with_conclusion=True,
+                 display_buffer_size=1,
                  ):
-        # creating the directories needed if they don't exit yet
-        try:
-            os.mkdir("logbooks")
-        except:
-            pass
-        try:
-            os.mkdir("baskets")
-        except:
-            pass
-        # figuring out the relevant file names 
+        # figuring out the relevant file names (the directories
+        # containing them are created when the files are opened)
         name = "{} {}".format(
             time_stamp(),
             title
@@ -367,142 +518,203 @@ class LogBook:
         # !TODO! maybe get rid of the toc_depth feature? 
         self.print_format = print_format
         if self.print_format == "org":
-            self.headings = lambda depth : "*" * depth
+            self.headings = ["*" * depth
+                             for depth in range(0, MAX_HEADING_DEPTH+1)]
             self.bullet = "-"
             self.pretty_title = "#+TITLE: {}\n".format(title)
         elif self.print_format == "md":
-            self.headings = lambda depth : "#" * (depth + 1)
+            self.headings = ["#" * (depth + 1)
+                             for depth in range(0, MAX_HEADING_DEPTH+1)]
             self.bullet = "*"
             self.pretty_title = "{}\n{}\n".format(title, "="*len(title))
         else:
             raise Exception("unsuported print format: {}".format(self.print_format))
+        # what precedes a heading in the logbook file only depends on
+        # its depth
+        self.heading_prefixes = [
+            "{}{} ".format("\n\n" if depth == 1 else "", marker)
+            for depth, marker in enumerate(self.headings)
+        ]
         # initializing parameters
         self.with_time = with_time
         self.with_mem = with_mem
-        if self.with_mem:
-            self.log_event("WARNING: measuring memory usage messes with time complexities!",
-                           desc="tr*")
         self.with_preamble = with_preamble 
         self.with_conclusion = with_conclusion
         self.title = title
         # initializing the state
         self.basket = {}
+        self.basket_stream = None
         self.story = []
+        self.story_file = None
         self.enum_counter = None
         self.investigated = None
         self.measurements = {
             "elapsed_time": {},
             "max_memory": None
         }
-        self.display = old_print
+        self.display_buffer = []
+        self.display_buffer_size = display_buffer_size
+        if self.display_buffer_size > 1:
+            self.display = self.buffered_display
+        else:
+            self.display = old_print
         # -- successes
         self.success_counter = 0
         self.fail_counter = 0
         self.care_about_success_or_fail = False
         # -- loops
         self.loop_depth = 0
+        # a single progress display is shared by all the loops, it is
+        # started when entering the LogBook
         self.progress_tracker = Progress(transient=True)
-        self.progress_tracker.__enter__()
             
         
 
     # !SUBSECTION! Logging events and results
     
+    def stop_timers(self, depth):
+        """Stops the on-going timers of sections of depth at least
+        `depth`, and stores their measurements in the basket."""
+        # A timer is only ever started once all the deeper ones have
+        # been stopped, so the keys of `timers` are in increasing order
+        # of depth, and the ones to stop are at its end.
+        timers = self.measurements["elapsed_time"]
+        while len(timers) > 0:
+            d = next(reversed(timers))
+            if d < depth:
+                break
+            elapsed = str(timers[d])
+            self.log_to_basket("elapsed_time", elapsed, desc="t*")
+            del timers[d]
+
+            
     def section(self, depth, heading, with_timer=False):
-        # checking if there is any on-going timer
-        for d in reversed(sorted(self.measurements["elapsed_time"].keys())):
-            if d >= depth:
-                elapsed = str(self.measurements["elapsed_time"][d])
-                self.log_to_basket("elapsed_time", elapsed, desc="t*")
-                del self.measurements["elapsed_time"][d]
+        while depth >= len(self.headings):
+            marker = self.headings[-1] + self.headings[-1][-1]
+            self.headings.append(marker)
+            self.heading_prefixes.append(marker + " ")
+        self.stop_timers(depth)
         # adding to the story
-        self.story.append({
+        self.add_to_story({
             "content": heading,
-            "type": "head" + str(depth)
+            "type": "head" + str(depth),
+            "prefix": self.heading_prefixes[depth]
         })
         # starting a timer if necessary
         if with_timer:
             self.measurements["elapsed_time"][depth] = Chronograph(heading)
         self.current_toc_depth = depth
         if self.verbose:
-            line = "{}{} {}".format(
+            style = 1 if depth == 1 else 2
+            self.display("{}{}{} {}{}{}{}{}".format(
+                HEADING_STARTS[style],
                 "\n" if depth == 1 else "",
-                self.headings(depth),
+                self.headings[depth],
                 heading,
-            )
-            line = stylize(line, "purple")
-            if depth == 1:
-                line = stylize(line, "bold")
-            line += stylize(" ({}) ".format(time_stamp()), "white")
-            self.display(line)
+                HEADING_ENDS[style],
+                HEADING_TSTAMP_START,
+                time_stamp(),
+                TSTAMP_END
+            ))
         
         
     def log_event(self, *event, desc="t*"):
-        tstamp = time_stamp()
-        all_events = []
-        for x in event:
-            all_events.append(x)
-        full_event = {"content": all_events}
+        mask = parse_desc(desc)
+        # the event is rendered once, both for the terminal and the file
+        rendered = input_for_print(event)
+        full_event = {}
         # do we need the time-stamp?
-        if "*" in desc:
+        if mask & DESC_NO_TSTAMP:
             full_event["tstamp"] = ""
         else:
-            full_event["tstamp"] = stylize("({}) ".format(tstamp), "white")
-        # do we need a color?
-        if "r" in desc:
-            style = "red"
-        elif "g" in desc:
-            style = "green"
-        else:
-            style = "black"
+            full_event["tstamp"] = TSTAMP_START + time_stamp() + TSTAMP_END
         # do we need a prefix?
-        if "0" in desc:
-            prefix_terminal = stylize("[FAIL] ", "red")
+        if mask & DESC_FAIL:
             prefix_text = "[FAIL] "
-        elif "1" in desc:
-            prefix_terminal = stylize("[SUCCESS] ", "green")
+        elif mask & DESC_SUCCESS:
             prefix_text = "[SUCCESS] "
         else:
-            prefix_terminal, prefix_text = "", ""
+            prefix_text = ""
         # handling the different styles
-        if "l" in desc:         # -- plain list
+        if mask & DESC_LIST:    # -- plain list
             self.enum_counter = None # stopping an enumeration (if any)
             full_event["type"] = "list"
-            if self.verbose:
-                self.display(full_event["tstamp"] +
-                             stylize(" {}{} {}".format(self.bullet,
-                                                       prefix_terminal,
-                                                       input_for_print(full_event["content"])),
-                                     style))
-        elif "n" in desc:       # -- numbered list
+            full_event["prefix"] = "{} {}".format(self.bullet, full_event["tstamp"])
+        elif mask & DESC_ENUM:  # -- numbered list
             if self.enum_counter == None:
                 self.enum_counter = 0
             else:
                 self.enum_counter += 1
             full_event["type"] = "enum" + str(self.enum_counter)
-            if self.verbose:
-                self.display(full_event["tstamp"] +
-                             stylize(" {:2d}.{} {}".format(self.enum_counter,
-                                                           prefix_terminal,
-                                                           input_for_print(full_event["content"])),
-                                     style))
+            full_event["prefix"] = "{}. {} ".format(self.enum_counter,
+                                                    full_event["tstamp"])
         else:                   # -- plain text
             self.enum_counter = None # stopping an enumeration (if any)
             full_event["type"] = "text"
-            if self.verbose:
-                self.display(full_event["tstamp"] +
-                             stylize("{}{}".format(prefix_terminal,
-                                                   input_for_print(full_event["content"])),
-                                     style))
-        full_event["content"] = prefix_text + str(full_event["content"])
-        self.story.append(full_event)
+            full_event["prefix"] = full_event["tstamp"]
+        # the terminal output is only built if it is needed
+        if self.verbose:
+            self.display_event(full_event["tstamp"], rendered, mask)
+        full_event["content"] = prefix_text + rendered
+        self.add_to_story(full_event)
+
+
+    def display_event(self, tstamp, rendered, mask):
+        """Prints an event in the terminal, with the colors and prefix
+        given by the bit mask `mask` (see `parse_desc`)."""
+        # do we need a color?
+        if mask & DESC_RED:
+            style = T_COLORS["red"]
+        elif mask & DESC_GREEN:
+            style = T_COLORS["green"]
+        else:
+            style = T_COLORS["black"]
+        # do we need a prefix?
+        if mask & DESC_FAIL:
+            prefix_terminal = FAIL_PREFIX
+        elif mask & DESC_SUCCESS:
+            prefix_terminal = SUCCESS_PREFIX
+        else:
+            prefix_terminal = ""
+        # handling the different styles
+        if mask & DESC_LIST:    # -- plain list
+            self.display("{}{} {}{} {}{}".format(
+                tstamp,
+                style,
+                self.bullet,
+                prefix_terminal,
+                rendered,
+                END_STYLE
+            ))
+        elif mask & DESC_ENUM:  # -- numbered list
+            self.display("{}{} {:2d}.{} {}{}".format(
+                tstamp,
+                style,
+                self.enum_counter,
+                prefix_terminal,
+                rendered,
+                END_STYLE
+            ))
+        else:                   # -- plain text
+            self.display("{}{}{}{}{}".format(
+                tstamp,
+                style,
+                prefix_terminal,
+                rendered,
+                END_STYLE
+            ))
 
             
     def log_to_basket(self, key, entry, desc="t"):
-        if key in self.basket.keys():
-            self.basket[key].append(entry)
-        else:
-            self.basket[key] = [entry]
+        self.basket.setdefault(key, []).append(entry)
+        # the basket file is only created once it is needed
+        if self.basket_stream == None:
+            os.makedirs(os.path.dirname(self.basket_file), exist_ok=True)
+            self.basket_stream = open(
+                self.basket_file + UNFINISHED_BASKET_SUFFIX,
+                "wb"
+            )
+        append_to_basket_file(key, entry, self.basket_stream)
         self.log_event("{}: {}".format(key, entry), desc=desc)
 
 
@@ -529,47 +741,65 @@ class LogBook:
         
 
 
+    # !SUBSECTION! Printing in the terminal
+
+    def buffered_display(self, line):
+        self.display_buffer.append(line)
+        if len(self.display_buffer) >= self.display_buffer_size:
+            self.flush()
+
+
+    def flush(self):
+        """Prints all the lines that have been logged but not yet
+        displayed in the terminal."""
+        if len(self.display_buffer) > 0:
+            old_print("\n".join(self.display_buffer))
+            self.display_buffer = []
+            
+
     # !SUBSECTION! Writing story to file 
         
+    def add_to_story(self, entry):
+        self.story.append(entry)
+        if len(self.story) >= STORY_BUFFER_SIZE and self.story_file != None:
+            self.write_story()
+
+
+    def open_story_file(self):
+        os.makedirs(os.path.dirname(self.file_name), exist_ok=True)
+        self.story_file = open(self.file_name, "w", buffering=2**16)
+        self.story_file.write("{}\n".format(self.pretty_title))
+
+        
+    def write_story(self):
+        """Writes the story entries that are still in memory to the
+        logbook file, and then forgets them."""
+        # the beginning of each line is computed when the entry is
+        # added to the story, so that writing the whole batch boils
+        # down to concatenations
+        self.story_file.write("".join(
+            line["prefix"] + line["content"] + "\n"
+            for line in self.story
+        ))
+        self.story = []
+
+        
     def save_to_file(self):
-        with open(self.file_name, "w") as f:
-            f.write("{}\n".format(self.pretty_title))
-            # writing the story
-            for line in self.story:
-                if "type" not in line.keys():
-                    raise Exception(
-                        "error: a story line doesn't have a type (story line: {})".format(line)
-                    )
-                elif line["type"][:4] == "head":
-                    depth = int(line["type"][4:], 10)
-                    f.write("{}{} {}\n".format(
-                        "\n\n" if depth == 1 else "",                
-                        self.headings(depth),
-                        line["content"]
-                    ))
-                elif line["type"][:4] == "enum":
-                    depth = int(line["type"][4:], 10)
-                    f.write("{}. {} {}\n".format(
-                        depth,
-                        line["tstamp"],
-                        line["content"]
-                    ))
-                elif line["type"] == "list":
-                    f.write("{} {}{}\n".format(
-                        self.bullet,
-                        line["tstamp"],
-                        line["content"]
-                    ))
-                else:
-                    f.write("{}{}\n".format(
-                        line["tstamp"],
-                        line["content"]
-                    ))
+        """Writes the story entries that are still in memory to the
+        logbook file. The file is only closed when the LogBook is
+        exited, so that this can be called at any time."""
+        self.flush()
+        if self.story_file == None:
+            self.open_story_file()
+        self.write_story()
+        self.story_file.flush()
 
 
     # !SUBSECTION! The functions needed by the "with" logic
 
     def __enter__(self):
+        self.open_story_file()
+        self.progress_tracker.__enter__()
         if self.verbose:
             self.display("\n" + stylize(stylize(self.title, "bold"), "underline") + "\n")
         # handling the preamble (if relevant)
@@ -605,7 +835,11 @@ class LogBook:
         # initializing measurements
         if self.with_time:
             self.measurements["elapsed_time"][0] = Chronograph("The experiment")
-        if self.with_mem:
+        if self.with_mem == "tracemalloc":
+            self.log_event("WARNING: measuring memory usage messes with time complexities!",
+                           desc="tr*")
+            self.measurements["max_memory"] = MemTracer(with_tracemalloc=True)
+        elif self.with_mem:
             self.measurements["max_memory"] = MemTracer()
         # setting up global variables
         global ONGOING_LOGBOOK
@@ -660,16 +894,29 @@ class LogBook:
                         float(log(self.fail_counter, 2) - log(total, 2))
                     )
                 self.display(line)
-        # storing the results
-        if len(self.basket.keys()) > 0:
-            self.basket["title"] = self.title
-            self.basket["finished at"] = time_stamp()
-            self.basket["file name"] = self.basket_file
-            archive_basket(self.basket, self.basket_file)
+        # storing the results; the timers that the last heading would
+        # stop are stopped first, so that the basket is complete when
+        # it is closed
+        self.stop_timers(2)
+        if self.basket_stream != None:
+            metadata = {
+                "title": self.title,
+                "finished at": time_stamp(),
+                "file name": self.basket_file,
+            }
+            self.basket.update(metadata)
+            pickle.dump(metadata, self.basket_stream,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+            self.basket_stream.close()
+            self.basket_stream = None
+            os.replace(self.basket_file + UNFINISHED_BASKET_SUFFIX,
+                       self.basket_file)
             self.section(2, "Basket written to {}".format(
                 self.basket_file
             ))
         self.save_to_file()
+        self.story_file.close()
+        self.story_file = None
         # undoing global modifications
         builtins.print = old_print
         ONGOING_LOGBOOK = None
@@ -683,6 +930,11 @@ class LogBook:
         bar that ends when `some_set` has been fully iterated
         over. `text` is a description of the set being looped over.
 
+        The progress bar is not updated after each iteration, but at
+        most PROGRESS_UPDATES_PER_SECOND times per second, which keeps
+        the cost of the bar negligible even when iterations are very
+        fast.
+
         """
         self.loop_depth += 1
         if self.loop_depth > 1:
@@ -691,11 +943,27 @@ class LogBook:
             title = "[red]{} ".format(text)
         task = self.progress_tracker.add_task(title, total=len(some_set))
         print(task)
+        update = self.progress_tracker.update
+        period = 1 / PROGRESS_UPDATES_PER_SECOND
+        clock = time.monotonic
+        pending = 0
+        last_update = clock()
         for i in some_set:
             # !TOSTART! do something clever about the context (use self.investigated somewhere)
             #self.investigated = i
             yield i
-            self.progress_tracker.update(task, advance=1)
+            pending += 1
+            # reading the clock is much cheaper than updating the bar,
+            # and doing it after each iteration ensures that the bar
+            # keeps moving even if the iterations become slower
+            now = clock()
+            if now - last_update >= period:
+                update(task, advance=pending)
+                pending = 0
+                last_update = now
+        if pending > 0:
+            update(task, advance=pending)
+        self.progress_tracker.remove_task(task)
         self.loop_depth -= 1
             
 
@@ -749,12 +1017,38 @@ def N_SUCCESSES():
 # !post-processing module.
 def archive_basket(results, file_name):
     with open(file_name, "wb") as f:
-        pickle.dump(results, f)
+        pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def append_to_basket_file(key, entry, f):
+    """Appends the basket entry `entry` with the given `key` to the
+    basket file `f`, which must be open in binary mode."""
+    pickle.dump((key, entry), f, protocol=pickle.HIGHEST_PROTOCOL)
 
 
 def open_basket(file):
+    """Returns the basket stored in `file` as a dictionary.
+
+    A basket file is a sequence of pickled objects: (key, entry)
+    pairs, which are gathered into lists indexed by their key, and
+    dictionaries, which are merged as they are into the result. A file
+    written by `archive_basket` is thus simply a basket made of a
+    single dictionary.
+
+    """
+    result = {}
     with open(file, "rb") as f:
-        return pickle.load(f)
+        while True:
+            try:
+                record = pickle.load(f)
+            except EOFError:
+                break
+            if isinstance(record, dict):
+                result.update(record)
+            else:
+                key, entry = record
+                result.setdefault(key, []).append(entry)
+    return result
 
 
 def grab_last_basket(*args):
@@ -765,19 +1059,27 @@ def grab_last_basket(*args):
         else:
             filters.append(x)
     try:
-        basket_list = os.listdir("./baskets")
+        with os.scandir("./baskets") as entries:
+            # the baskets of running LogBooks are not finished yet
+            basket_list = [
+                entry.name for entry in entries
+                if not entry.name.endswith(UNFINISHED_BASKET_SUFFIX)
+            ]
     except:
         raise Exception("could not open ./baskets directory!")
-    if len(filters) == 0:
+    # basket names start with a time-stamp, so the latest basket is
+    # the greatest name
+    if len(filters) == 0 and len(basket_list) > 0:
         # default case: we grab the latest
-        basket_list.sort()
-        return open_basket("./baskets/" + basket_list[-1])
+        return open_basket("./baskets/" + max(basket_list))
     else:
-        # otherwise, we grab the first that matches all the inputs
-        for name in reversed(basket_list):
+        # otherwise, we grab the latest that matches all the inputs
+        patterns = [re.compile(x) for x in filters]
+        basket_list.sort(reverse=True)
+        for name in basket_list:
             good = True
-            for x in filters:
-                if not re.search(x, name):
+            for p in patterns:
+                if not p.search(name):
                     good = False
                     break
             if good:
@@ -3,13 +3,8 @@
 # Time-stamp: <2024-08-08 17:24:29 leo>
 
 
-import hashlib
 import time
 import os
-import ctypes
-
-from math import log, ceil
-from copy import copy
 
 from .cpputils import *
 
@@ -43,17 +38,17 @@ class ReproduciblePRG:
 
     def reseed_from_time_and_pid(self):
         """Reseeds the internal state of the cipher by updating the
-        state using the string representations of the current UNIX
-        time and of the pid of the program.
+        state using the byte representations of the current UNIX
+        time (in nanoseconds) and of the pid of the program.
 
-        Returns the list of strings that have been absorbed into the
-        state.
+        Returns the list of byte strings that have been absorbed into
+        the state.
 
         Obviously shouldn't used to generate cryptographic keys.
 
         """
         blocks = [
-            str(time.time()).encode("UTF-8"),        # machine time
+            time.time_ns().to_bytes(8, "little"),    # machine time
             int(os.getpid()).to_bytes(16, "little")  # PID of the
                                                      # current program
         ]
@@ -69,8 +64,8 @@ class ReproduciblePRG:
 
         We use rejection sampling, so if the value range
         (upper_bound-lower_bound) is just above a power of 2 then we
-        might need to recursively call this function up to twice on
-        average before actually getting a valid output.
+        might need to draw up to two candidates on average before
+        actually getting a valid output.
 
         """
         if lower_bound >= upper_bound:
@@ -80,15 +75,15 @@ class ReproduciblePRG:
                     lower_bound
                 ))
         value_range = upper_bound - lower_bound
-        bit_length = ceil(log(value_range, 2))
-        alea = self.edf.get_n_bit_unsigned_integer(bit_length)
-        potential_output = lower_bound + alea
+        # the number of bits needed to write value_range-1, computed
+        # exactly (unlike with a floating point logarithm)
+        bit_length = (value_range - 1).bit_length()
+        get_alea = self.edf.get_n_bit_unsigned_integer
         # rejection sampling
-        if potential_output < upper_bound:
-            return potential_output
-        else:
-            return self(lower_bound=lower_bound,
-                        upper_bound=upper_bound)
+        while True:
+            alea = get_alea(bit_length)
+            if alea < value_range:
+                return lower_bound + alea
 
 
     def __str__(self):
@@ -52,17 +52,3 @@ class EschRG(SparkleRG):
         else:
             self.absorbed.append(to_absorb)
             self.absorb(to_absorb)        
-    def random_permutation(self, v_size):
-        """Returns the set of integers {0,...,v_size-1} after
-        undergoing a permutation picked uniformly at random.
-    
-        Relies on a Fisher-Yates shuffle to do so.
-    
-        https://en.wikipedia.org/wiki/Fisher%E2%80%93Yates_shuffle
-    
-        """
-        result = list(range(0, v_size))
-        for i in range(0, v_size):
-            j = self(i, v_size)
-            result[i], result[j] = result[j], result[i]
-        return result
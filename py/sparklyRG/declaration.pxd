@@ -5,7 +5,8 @@ cdef extern from "./sparkle512.cpp":
     cdef cppclass Sparkle512core:
         Sparkle512core() except +
         void setup(const unsigned int steps, const unsigned int)
-        void absorb(const vector[uint8_t])
-        uint64_t get_n_bit_unsigned_integer(const unsigned int n)
+        void absorb(const vector[uint8_t]&)
+        uint64_t get_n_bit_unsigned_integer(const unsigned int n) except + nogil
         uint64_t get_unsigned_integer_in_range(const uint64_t lower,
-                                               const uint64_t upper)
+                                               const uint64_t upper) except + nogil
+        vector[uint64_t] random_permutation(const uint64_t v_size) except + nogil
@@ -3,13 +3,15 @@
 Sparkle512core::Sparkle512core():
     steps(0),
     state{{0}},
-    entropy_tank(0, false),
+    entropy_tank(0, 0),
+    entropy_size(0),
     entropy_cursor(0) {}
 
 void Sparkle512core::setup(const unsigned int _steps, const unsigned int _output_rate)
 {
     steps = _steps;
-    entropy_tank.assign(_output_rate, false);
+    entropy_size = _output_rate;
+    entropy_tank.assign((_output_rate + 63) / 64, 0);
 }
 
 void Sparkle512core::_permute()
@@ -61,18 +63,25 @@ void Sparkle512core::_permute()
 
 void Sparkle512core::_squeeze()
 {
-    uint32_t tmp;
-    for (unsigned int i=0; i<entropy_tank.size(); i += 32)
+    uint64_t tmp;
+    for (unsigned int i=0; i<entropy_size; i += 32)
     {
-        unsigned int k = i / 32; 
-        tmp = state[k]; 
-        for(unsigned int j=0; j<32; j++)
-            entropy_tank[i+j] = (__builtin_parityll(state[k] >> j));
+        // bit j of tmp becomes the parity of state[i / 32] >> j
+        tmp = state[i / 32];
+        tmp ^= tmp >> 1;
+        tmp ^= tmp >> 2;
+        tmp ^= tmp >> 4;
+        tmp ^= tmp >> 8;
+        tmp ^= tmp >> 16;
+        if (i % 64 == 0)
+            entropy_tank[i / 64] = tmp;
+        else
+            entropy_tank[i / 64] |= tmp << 32;
     }
     entropy_cursor = 0;
 }
 
-void Sparkle512core::absorb(const std::vector<uint8_t> byte_array)
+void Sparkle512core::absorb(const std::vector<uint8_t> &byte_array)
 {
     state[2*N_BRANCHES-1] ^= 1;
     for(unsigned int i=0; i<byte_array.size(); i+=4)
@@ -88,17 +97,25 @@ void Sparkle512core::absorb(const std::vector<uint8_t> byte_array)
 
 uint64_t Sparkle512core::get_n_bit_unsigned_integer(const unsigned int n)
 {
-    uint64_t result = 0;
-    for (unsigned int i=0; i<n; i ++)
+    uint64_t result = 0, chunk;
+    unsigned int filled = 0, offset, taken;
+    while (filled < n)
     {
-        if (entropy_cursor == entropy_tank.size())
+        if (entropy_cursor == entropy_size)
         {
             _permute();
             _squeeze();
         }
-        if (entropy_tank[entropy_cursor])
-            result |= (1 << i);
-        entropy_cursor ++;
+        // taking as many bits as possible from the current word
+        offset = entropy_cursor % 64;
+        taken = std::min(std::min(n - filled, 64 - offset),
+                         entropy_size - entropy_cursor);
+        chunk = entropy_tank[entropy_cursor / 64] >> offset;
+        if (taken < 64)
+            chunk &= (((uint64_t)1) << taken) - 1;
+        result |= chunk << filled;
+        filled += taken;
+        entropy_cursor += taken;
     }
     return result;
 }
@@ -117,3 +134,13 @@ uint64_t Sparkle512core::get_unsigned_integer_in_range(
     } while (output >= range) ;
     return lower_bound + output;    
 }
+
+std::vector<uint64_t> Sparkle512core::random_permutation(const uint64_t v_size)
+{
+    std::vector<uint64_t> result(v_size);
+    for (uint64_t i=0; i<v_size; i ++)
+        result[i] = i;
+    for (uint64_t i=0; i<v_size; i ++)
+        std::swap(result[i], result[get_unsigned_integer_in_range(i, v_size)]);
+    return result;
+}
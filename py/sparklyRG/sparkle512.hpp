@@ -1,6 +1,7 @@
 #include<vector>
 #include<cstdint>
 #include<array>
+#include<algorithm>
 
 #define ROT(x, n) (((x) >> (n)) | ((x) << (32-(n))))
 #define ELL(x) (ROT(((x) ^ ((x) << 16)), 16))
@@ -16,15 +17,17 @@ class Sparkle512core {
 private:
     unsigned int steps;
     std::array<uint32_t, 2*N_BRANCHES> state;
-    std::vector<bool> entropy_tank;
+    std::vector<uint64_t> entropy_tank;
+    unsigned int entropy_size;
     unsigned int entropy_cursor;
     public:
     Sparkle512core();
     void setup(const unsigned int _steps, const unsigned int _output_rate);
-    void absorb(const std::vector<uint8_t> byte_array);
+    void absorb(const std::vector<uint8_t> &byte_array);
     uint64_t get_n_bit_unsigned_integer(const unsigned int n);
     uint64_t get_unsigned_integer_in_range(const uint64_t lower_bound,
                                            const uint64_t upper_bound);
+    std::vector<uint64_t> random_permutation(const uint64_t v_size);
     
     void _squeeze();
     void _permute();
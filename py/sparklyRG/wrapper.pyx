@@ -1,25 +1,82 @@
 from declaration cimport *
+from cpython.pythread cimport PyThread_type_lock, PyThread_allocate_lock, \
+    PyThread_free_lock, PyThread_acquire_lock, PyThread_release_lock, \
+    WAIT_LOCK
 
 cdef class SparkleRG:
     cdef Sparkle512core core
-    
+    cdef PyThread_type_lock lock
+    cdef bint busy
+
+    def __cinit__(self):
+        self.lock = PyThread_allocate_lock()
+        if self.lock == NULL:
+            raise MemoryError("could not allocate the lock of a SparkleRG")
+
+
+    def __dealloc__(self):
+        if self.lock != NULL:
+            PyThread_free_lock(self.lock)
+
+            
     def __init__(self, steps, output_rate):
         self.core = Sparkle512core()
         self.core.setup(steps, output_rate)
 
 
+    cdef void wait_until_free(self):
+        # another thread may have started using the core again by the
+        # time we get the GIL back, hence the loop
+        while self.busy:
+            with nogil:
+                PyThread_acquire_lock(self.lock, WAIT_LOCK)
+                PyThread_release_lock(self.lock)
+
+        
     def absorb(self, x):
         to_absorb = x + b"1" + b"0"*(63 - len(x))
+        if self.busy:
+            self.wait_until_free()
         self.core.absorb(to_absorb)
 
         
     def get_n_bit_unsigned_integer(self, n):
         if n > 64:
             raise Exception("Cannot return integers more than 64-bit long")
-        return self.core.get_n_bit_unsigned_integer(n)
+        cdef unsigned int n_bits = n
+        if self.busy:
+            self.wait_until_free()
+        return self.core.get_n_bit_unsigned_integer(n_bits)
 
     
     def __call__(self, lower, upper):
         if upper <= lower:
             raise Exception("`upper` must be strictly higher than `lower`")
-        return self.core.get_unsigned_integer_in_range(lower, upper)
+        cdef uint64_t lo = lower, up = upper
+        if self.busy:
+            self.wait_until_free()
+        return self.core.get_unsigned_integer_in_range(lo, up)
+
+
+    def random_permutation(self, v_size):
+        """Returns the set of integers {0,...,v_size-1} after
+        undergoing a permutation picked uniformly at random.
+    
+        Relies on a Fisher-Yates shuffle to do so.
+    
+        https://en.wikipedia.org/wiki/Fisher%E2%80%93Yates_shuffle
+    
+        """
+        cdef uint64_t n = v_size
+        cdef vector[uint64_t] result
+        if self.busy:
+            self.wait_until_free()
+        self.busy = True
+        PyThread_acquire_lock(self.lock, WAIT_LOCK)
+        try:
+            with nogil:
+                result = self.core.random_permutation(n)
+        finally:
+            PyThread_release_lock(self.lock)
+            self.busy = False
+        return result